@@ -1,12 +1,14 @@
 import ast
 import json
 import os
-import requests
-from google import genai
-from google.genai import types
-from dotenv import load_dotenv
+import time
+from lazy_imports import LazyModule
+from rate_limit import AdmissionController, BACKGROUND, INTERACTIVE
 
-load_dotenv()
+# Heavy SDKs are imported on first use so importing this module stays cheap
+requests = LazyModule("requests")
+genai = LazyModule("google.genai")
+types = LazyModule("google.genai.types")
 
 # Configuration dictionary for dashboard generation
 DASHBOARD_CONFIG = {
@@ -144,10 +146,52 @@ DASHBOARD_CONFIG = {
         }
     }
 
+# Turn types of the dashboard conversation, see AIProcessor.classify_turn
+API_SELECTION = "api_selection"
+FINAL_LAYOUT = "final_layout"
+
+# Model and thinking budget per turn type. API selection turns only pick the next
+# API call, so they run on a fast model with a small thinking budget; only the turn
+# that lays out the tiles uses the larger model with unbounded thinking.
+TURN_POLICY = {
+    API_SELECTION: {
+        "model": "gemini-2.5-flash",
+        "thinking_budget": 1024,
+        "instruction": "In this step only decide the next API call. If no more API calls are needed, set finished_or_make_api_call to true and return an empty tiles list; the layout is generated in the next step.",
+    },
+    FINAL_LAYOUT: {"model": DASHBOARD_CONFIG["model"], "thinking_budget": -1, "instruction": None},
+}
+
+# Shared Gemini quota across all users and requests
+GEMINI_BUDGET = {
+    "max_concurrency": 4,
+    "tokens_per_minute": 1000000,
+    # Tokens reserved for the model's output and thinking on top of the prompt estimate
+    "output_token_allowance": 16000,
+    # Seconds a call may wait for admission before it is shed
+    "admission_timeout": {INTERACTIVE: 60, BACKGROUND: 10},
+}
+
+admission = AdmissionController(GEMINI_BUDGET["max_concurrency"], GEMINI_BUDGET["tokens_per_minute"])
+
 class AIProcessor:
-    def __init__(self):
-        self.client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+    def __init__(self, tiered_models=True):
+        self._client = None
+        # False runs every turn with the FINAL_LAYOUT policy
+        self.tiered_models = tiered_models
         self.base_url = "http://localhost:8000"
+        # One entry per model turn of the most recently finished call_ai run. Each run
+        # builds its own log, so concurrent runs on this shared processor never mix records
+        self.last_turn_log = []
+
+    @property
+    def client(self):
+        """Create the Gemini client on first use instead of at construction time."""
+        if self._client is None:
+            from dotenv import load_dotenv
+            load_dotenv()
+            self._client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+        return self._client
 
     def parse_coordinates(self, coordinates_str):
         """Parse coordinates string using ast.literal_eval with error handling."""
@@ -216,8 +260,17 @@ class AIProcessor:
                 "status_code": getattr(e.response, 'status_code', None) if hasattr(e, 'response') else None
             }
 
-    def generate_dashboard(self, user_input=None, user_preferences=None, apis_available=None, api_context=""):
-        """Generate dashboard configuration using the dictionary-based approach."""
+    def estimate_tokens(self, system_instruction, input_text):
+        """Rough token estimate (about 4 characters per token) used for admission control."""
+        return (len(system_instruction) + len(input_text)) // 4 + GEMINI_BUDGET["output_token_allowance"]
+
+    def generate_dashboard(self, user_input=None, user_preferences=None, apis_available=None, api_context="", priority=BACKGROUND, turn_type=FINAL_LAYOUT, turn_log=None):
+        """Generate dashboard configuration using the dictionary-based approach.
+
+        The model and thinking budget come from TURN_POLICY[turn_type]. If turn_log
+        is given, a record of this turn is appended to it.
+        Raises OverBudget if the shared Gemini budget cannot admit the call in time.
+        """
         # Use provided parameters or defaults from config
         input_text = user_input or DASHBOARD_CONFIG["user_input"]
         preferences = user_preferences or DASHBOARD_CONFIG["user_preferences"]
@@ -239,6 +292,32 @@ class AIProcessor:
         if api_context:
             system_instruction += f"\n\nAPI Response Context:\n\n{api_context}"
 
+        policy = TURN_POLICY[turn_type]
+        if policy["instruction"]:
+            input_text += "\n\n" + policy["instruction"]
+        estimated_tokens = self.estimate_tokens(system_instruction, input_text)
+        admission.acquire(priority, estimated_tokens, GEMINI_BUDGET["admission_timeout"][priority])
+        actual_tokens = None
+        started = time.perf_counter()
+        try:
+            returnText, actual_tokens = self.stream_model_text(policy["model"], policy["thinking_budget"], system_instruction, input_text)
+        finally:
+            admission.release(estimated_tokens, actual_tokens)
+        if turn_log is not None:
+            turn_log.append({
+                "turn_type": turn_type,
+                "model": policy["model"],
+                "thinking_budget": policy["thinking_budget"],
+                "seconds": time.perf_counter() - started,
+                "tokens": actual_tokens if actual_tokens is not None else estimated_tokens,
+            })
+        
+        # Process the response to parse string parameters into proper data types
+        processed_response = self.process_dashboard_response(returnText)
+        return processed_response if processed_response is not None else returnText
+
+    def stream_model_text(self, model, thinking_budget, system_instruction, input_text):
+        """Run one Gemini turn and return (response text, total tokens reported or None)."""
         contents = [
             types.Content(
                 role="user",
@@ -283,7 +362,7 @@ class AIProcessor:
 
         generate_content_config = types.GenerateContentConfig(
             thinking_config=types.ThinkingConfig(
-                thinking_budget=-1,
+                thinking_budget=thinking_budget,
             ),
             response_mime_type="application/json",
             response_schema=genai.types.Schema(
@@ -297,27 +376,56 @@ class AIProcessor:
         )
 
         returnText = ""
+        total_tokens = None
         for chunk in self.client.models.generate_content_stream(
-            model=DASHBOARD_CONFIG["model"],
+            model=model,
             contents=contents,
             config=generate_content_config,
         ):
             if chunk.text:
                 returnText += chunk.text
-        
-        # Process the response to parse string parameters into proper data types
-        processed_response = self.process_dashboard_response(returnText)
-        return processed_response if processed_response is not None else returnText
+            usage = getattr(chunk, "usage_metadata", None)
+            if usage is not None and usage.total_token_count:
+                total_tokens = usage.total_token_count
+        return returnText, total_tokens
+
+    def classify_turn(self, response):
+        """A response that asks for another API call is an API selection turn, a finished one is the final layout."""
+        if isinstance(response, dict) and not response.get("finished_or_make_api_call", True):
+            return API_SELECTION
+        return FINAL_LAYOUT
+
+    def call_ai(self, user_preferences=None, apis_available=None, priority=BACKGROUND):
+        """Main method that handles the AI conversation loop with API calls.
+
+        While the model is still choosing API calls the turns run on the fast
+        API_SELECTION tier. Once it reports finished, one FINAL_LAYOUT turn on the
+        larger model builds the tiles from the collected API responses.
+
+        The per-turn records are published as last_turn_log when the run ends.
+
+        Raises OverBudget if any turn is shed by the Gemini admission control.
+        """
+        turn_log = []
+        try:
+            return self._run_conversation(user_preferences, apis_available, priority, turn_log)
+        finally:
+            self.last_turn_log = turn_log
 
-    def call_ai(self, user_preferences=None, apis_available=None):
-        """Main method that handles the AI conversation loop with API calls."""
+    def _run_conversation(self, user_preferences, apis_available, priority, turn_log):
         print("Starting AI conversation loop...")
         
+        # Without APIs there is nothing to select, so go straight to the layout
+        turn_type = API_SELECTION if apis_available and self.tiered_models else FINAL_LAYOUT
+        
         # Initial call to AI
         response = self.generate_dashboard(
             user_input="Generate a dashboard based on the provided APIs and user preferences.",
             user_preferences=user_preferences,
-            apis_available=apis_available
+            apis_available=apis_available,
+            priority=priority,
+            turn_type=turn_type,
+            turn_log=turn_log
         )
         
         if not response:
@@ -330,10 +438,10 @@ class AIProcessor:
         
         while iteration < max_iterations:
             iteration += 1
-            print(f"\n--- Iteration {iteration} ---")
+            print(f"\n--- Iteration {iteration} ({turn_type}) ---")
             
             # Check if AI wants to make an API call
-            if not response.get("finished_or_make_api_call", True):
+            if self.classify_turn(response) == API_SELECTION:
                 endpoint = response.get("endpoint", "")
                 api_body = response.get("api_body", {})
                 
@@ -353,7 +461,10 @@ class AIProcessor:
                         user_input="Continue processing with the API response data.",
                         user_preferences=user_preferences,
                         apis_available=apis_available,
-                        api_context=api_context
+                        api_context=api_context,
+                        priority=priority,
+                        turn_type=turn_type,
+                        turn_log=turn_log
                     )
                     
                     if not response:
@@ -362,6 +473,14 @@ class AIProcessor:
                 else:
                     print("AI wants to make API call but endpoint or body is missing")
                     break
+            elif turn_type == API_SELECTION:
+                print("AI has finished selecting APIs, generating final layout")
+                turn_type = FINAL_LAYOUT
+                response = self._final_layout(user_preferences, apis_available, api_context, priority, turn_log)
+                
+                if not response:
+                    print("Failed to get final layout from AI")
+                    break
             else:
                 print("AI has finished processing and generated dashboard")
                 break
@@ -369,8 +488,24 @@ class AIProcessor:
         if iteration >= max_iterations:
             print("Reached maximum iterations, returning current response")
         
+        if turn_type == API_SELECTION:
+            # Selection turns never contain tiles, so lay out whatever API data was collected
+            print("Stopped while selecting APIs, generating final layout from the data collected so far")
+            response = self._final_layout(user_preferences, apis_available, api_context, priority, turn_log)
+        
         return response
 
+    def _final_layout(self, user_preferences, apis_available, api_context, priority, turn_log):
+        return self.generate_dashboard(
+            user_input="All needed API data has been collected. Generate the final dashboard from the API response data.",
+            user_preferences=user_preferences,
+            apis_available=apis_available,
+            api_context=api_context,
+            priority=priority,
+            turn_type=FINAL_LAYOUT,
+            turn_log=turn_log
+        )
+
 # Example usage
 if __name__ == "__main__":
     # Example user preferences and APIs
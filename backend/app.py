@@ -1,55 +1,149 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
 import os
 import re
 import json
+import threading
 from datetime import datetime, timezone
 from AIProcessor import AIProcessor
-import requests
+from rate_limit import rate_limited, OverBudget, INTERACTIVE, BACKGROUND
+from lazy_imports import LazyModule
+import snapshot
+from user_store import ShardedUserStore
+from dashboard_cache import DashboardResponseCache, SUPPORTED_ENCODINGS
+
+# Imported on first use; generated API routes below may still call requests.*
+requests = LazyModule("requests")
 
 app = Flask(__name__)
 
-CORS(app)  # Enable CORS for all routes
-
-user_db = {
-    "demo@nalflo.com": {
-        "password": "demo123",
-        "name": "Demo User",
-        "email": "demo@nalflo.com",
-        "dash_preferences": {"user_input": ""},
-        "APIs": {},
-        "files": {},
-        "last_login": datetime.now(timezone.utc).timestamp(),
-        "latest_dashboard": None
+CORS(app, expose_headers=["ETag"])  # Enable CORS for all routes; the dashboard reads ETag
+
+def default_user_db():
+    return {
+        "demo@nalflo.com": {
+            "password": "demo123",
+            "name": "Demo User",
+            "email": "demo@nalflo.com",
+            "dash_preferences": {"user_input": ""},
+            "APIs": {},
+            "files": {},
+            "last_login": datetime.now(timezone.utc).timestamp(),
+            "latest_dashboard": None
+        }
     }
-}
 
-def save_server():
-    with open("server.json", "w") as f:
-        json.dump(user_db, f, indent=2)
+# "json" keeps the readable server.json, "snapshot" uses the compact binary server.snap
+SERVER_FORMAT = os.getenv("NALFLO_SERVER_FORMAT", "json")
+SERVER_FILE = "server.snap" if SERVER_FORMAT == "snapshot" else "server.json"
+
+# NALFLO_SHARDS > 0 partitions users over that many shard files in SHARD_DIR, hashed by
+# username or, with NALFLO_SHARD_KEY=tenant, by email domain (see user_store.py)
+SHARD_COUNT = int(os.getenv("NALFLO_SHARDS", "0"))
+SHARD_KEY = os.getenv("NALFLO_SHARD_KEY", "username")
+SHARD_DIR = "shards"
+
+# Populated from SERVER_FILE or the shards on the first request (see ensure_user_db)
+user_db = ShardedUserStore(SHARD_DIR, SHARD_COUNT, SHARD_KEY, SERVER_FORMAT) if SHARD_COUNT > 0 else {}
+_user_db_loaded = False
+_user_db_lock = threading.Lock()
 
-if not os.path.exists("server.json"):
-    save_server()
+# Unsharded store: _records_lock guards the records, _save_lock keeps two saves from writing SERVER_FILE at once
+_records_lock = threading.RLock()
+_save_lock = threading.Lock()
+
+def user_lock(username):
+    """Lock to hold while changing user_db[username] in place. Call save_server after leaving the block."""
+    if isinstance(user_db, ShardedUserStore):
+        return user_db.locked(username)
+    return _records_lock
+
+def save_server(username=None, usernames=None):
+    """Persist the store. When sharded, only the shards holding username/usernames are written."""
+    if isinstance(user_db, ShardedUserStore):
+        user_db.save([username] if username is not None else usernames)
+        return
+    with _save_lock:
+        # Encode under the records lock so a handler cannot change a record mid-encode
+        with _records_lock:
+            if SERVER_FORMAT == "snapshot":
+                codec, encoded = snapshot.encode_records(user_db.items())
+            else:
+                data = json.dumps(user_db, indent=2)
+        if SERVER_FORMAT == "snapshot":
+            snapshot.write_encoded(SERVER_FILE, codec, encoded)
+            return
+        with open(SERVER_FILE, "w") as f:
+            f.write(data)
 
 def load_server():
-    with open("server.json", "r") as f:
+    if SERVER_FORMAT == "snapshot":
+        return snapshot.load_all(SERVER_FILE)
+    with open(SERVER_FILE, "r") as f:
         user_db = json.load(f)
     return user_db
 
-user_db = load_server()
+def ensure_user_db():
+    """Load user data the first time it is needed instead of at import time."""
+    global _user_db_loaded
+    if _user_db_loaded:
+        return
+    with _user_db_lock:
+        if _user_db_loaded:
+            return
+        if SERVER_FORMAT == "snapshot" and not os.path.exists(SERVER_FILE) and os.path.exists("server.json"):
+            # First start after switching formats: migrate the existing JSON store
+            snapshot.import_json("server.json", SERVER_FILE)
+        if isinstance(user_db, ShardedUserStore):
+            legacy_users = None
+            if not os.path.exists(user_db.map_path):
+                # First sharded start: seed the shards from the single-file store
+                legacy_users = load_server() if os.path.exists(SERVER_FILE) else default_user_db()
+            user_db.load(legacy_users)
+        elif not os.path.exists(SERVER_FILE):
+            user_db.update(default_user_db())
+            save_server()
+        else:
+            user_db.update(load_server())
+        _user_db_loaded = True
+
+@app.before_request
+def load_user_db_before_request():
+    ensure_user_db()
+
+# Serialized and compressed /get_dashboard responses, rebuilt when a dashboard is refreshed
+dashboard_cache = DashboardResponseCache()
 
+# The Gemini client is created lazily on the first dashboard generation
 processor = AIProcessor()
 
-def refresh_dashboard(username):
+def create_app(preload=False):
+    """Return the configured app. With preload=True user data and the Gemini client are warmed up front."""
+    if preload:
+        ensure_user_db()
+        processor.client
+    return app
+
+def refresh_dashboard(username, priority=BACKGROUND):
     if username not in user_db:
         return jsonify({"error": "User not found"}), 404
-    apis = user_db[username]['APIs']
-    apis_available = {}
-    for api in apis:
-        apis_available[api] = apis[api]['description']+ "\n" + "Request body: " + apis[api]['body_format']
-    response = processor.call_ai(user_preferences=user_db[username]['dash_preferences'], apis_available=apis_available)
-    user_db[username]['latest_dashboard'] = response
-    save_server()
+    # Copy what the model needs under the lock; the model call itself runs without it
+    with user_lock(username):
+        apis = user_db[username]['APIs']
+        apis_available = {}
+        for api in apis:
+            apis_available[api] = apis[api]['description']+ "\n" + "Request body: " + apis[api]['body_format']
+        dash_preferences = dict(user_db[username]['dash_preferences'])
+    try:
+        response = processor.call_ai(user_preferences=dash_preferences, apis_available=apis_available, priority=priority)
+    except OverBudget as e:
+        # Shed load: keep serving the cached dashboard until there is budget again
+        print(f"Dashboard refresh for {username} shed: {e}")
+        return jsonify({"message": "Gemini budget exceeded, serving cached dashboard", "dashboard": user_db[username].get('latest_dashboard'), "stale": True}), 200
+    with user_lock(username):
+        user_db[username]['latest_dashboard'] = response
+    dashboard_cache.invalidate(username)
+    save_server(username)
     return jsonify({"message": "Dashboard refreshed successfully"}), 200
 
 # New APIs go here
@@ -86,10 +180,11 @@ def create_api():
         "body_format": body_format
     }
     
-    user_db[username]['APIs'][endpoint] = api_info
+    with user_lock(username):
+        user_db[username]['APIs'][endpoint] = api_info
     
     # Save server before writing API to file
-    save_server()
+    save_server(username)
     
     # Write the API code to app.py file
     try:
@@ -98,30 +193,18 @@ def create_api():
     except Exception as e:
         return jsonify({"error": f"Failed to write API to file: {str(e)}"}), 500
 
-def write_api_to_file(endpoint, function_name, code):
-    """Write API code to app.py file for persistence"""
+def read_app_py():
     app_py_path = os.path.join(os.path.dirname(__file__), 'app.py')
-    
-    # Read current file content
     with open(app_py_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    # Find the insertion point (after "# New APIs go here")
-    insertion_point = content.find('# New APIs go here')
-    if insertion_point == -1:
-        raise Exception("Could not find insertion point in app.py")
-    
-    # Find the end of the line after the comment
-    line_end = content.find('\n', insertion_point)
-    if line_end == -1:
-        line_end = len(content)
-    
-    # Create the API route code
-    route_name = endpoint.replace('/', '_').replace('-', '_').strip('_')
-    if not route_name:
-        route_name = 'root'
-    
-    # Properly indent the user's code while preserving relative indentation
+        return f.read()
+
+def write_app_py(content):
+    app_py_path = os.path.join(os.path.dirname(__file__), 'app.py')
+    with open(app_py_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+def indent_api_code(code):
+    """Indent the user's code for the try block while preserving relative indentation"""
     lines = code.split('\n')
     indented_lines = []
     
@@ -145,7 +228,20 @@ def write_api_to_file(endpoint, function_name, code):
         else:  # Empty line
             indented_lines.append('')
     
-    indented_code = '\n'.join(indented_lines)
+    return '\n'.join(indented_lines)
+
+def insert_api_code(content, endpoint, function_name, code):
+    """Return content with a route for the API inserted at the new APIs marker"""
+    insertion_point = content.find('# New APIs go here')
+    if insertion_point == -1:
+        raise Exception("Could not find insertion point in app.py")
+    
+    # Find the end of the line after the comment
+    line_end = content.find('\n', insertion_point)
+    if line_end == -1:
+        line_end = len(content)
+    
+    indented_code = indent_api_code(code)
     
     api_code = f"""
 @app.route('{endpoint}', methods=['POST'])
@@ -157,21 +253,10 @@ def {function_name}():
 
 """
     
-    # Insert the API code
-    new_content = content[:line_end + 1] + api_code + content[line_end + 1:]
-    
-    # Write back to file
-    with open(app_py_path, 'w', encoding='utf-8') as f:
-        f.write(new_content)
+    return content[:line_end + 1] + api_code + content[line_end + 1:]
 
-def update_api_code_in_file(endpoint, function_name, new_code):
-    """Update existing API code in app.py file"""
-    app_py_path = os.path.join(os.path.dirname(__file__), 'app.py')
-    
-    # Read current file content
-    with open(app_py_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
+def replace_api_code(content, endpoint, function_name, new_code):
+    """Return content with the body of an existing API route replaced"""
     # Find the function definition
     function_pattern = f"@app.route\\('{re.escape(endpoint)}'.*?\\ndef {function_name}\\(\\):"
     function_match = re.search(function_pattern, content, re.DOTALL)
@@ -192,48 +277,14 @@ def update_api_code_in_file(endpoint, function_name, new_code):
     
     except_start = try_start + except_match.start()
     
-    # Properly indent the new code
-    lines = new_code.split('\n')
-    indented_lines = []
-    
-    # Find the minimum indentation level (excluding empty lines)
-    min_indent = float('inf')
-    for line in lines:
-        if line.strip():  # Non-empty line
-            leading_spaces = len(line) - len(line.lstrip())
-            min_indent = min(min_indent, leading_spaces)
-    
-    # If no non-empty lines found, set min_indent to 0
-    if min_indent == float('inf'):
-        min_indent = 0
-    
-    # Process each line: remove common indentation, then add 8 spaces for try block
-    for line in lines:
-        if line.strip():  # Non-empty line
-            # Remove the common minimum indentation, then add 8 spaces
-            relative_indent = len(line) - len(line.lstrip()) - min_indent
-            indented_lines.append('        ' + ' ' * relative_indent + line.strip())
-        else:  # Empty line
-            indented_lines.append('')
-    
-    indented_code = '\n'.join(indented_lines)
+    indented_code = indent_api_code(new_code)
     
     # Replace the code between try: and except
     try_line_end = content.find('\n', try_start + 4)  # +4 for "try:"
-    new_content = content[:try_line_end + 1] + indented_code + '\n    ' + content[except_start:]
-    
-    # Write back to file
-    with open(app_py_path, 'w', encoding='utf-8') as f:
-        f.write(new_content)
+    return content[:try_line_end + 1] + indented_code + '\n    ' + content[except_start:]
 
-def remove_api_from_file(endpoint, function_name):
-    """Remove API code from app.py file"""
-    app_py_path = os.path.join(os.path.dirname(__file__), 'app.py')
-    
-    # Read current file content
-    with open(app_py_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
+def strip_api_code(content, endpoint, function_name):
+    """Return content with an API route removed"""
     # Find the function definition pattern
     function_pattern = f"@app.route\\('{re.escape(endpoint)}'.*?\\ndef {function_name}\\(\\):.*?except Exception as e:.*?return jsonify\\(.*?\\), 500\\s*"
     
@@ -247,11 +298,25 @@ def remove_api_from_file(endpoint, function_name):
     new_content = content[:function_match.start()] + content[function_match.end():]
     
     # Clean up any extra blank lines that might be left
-    new_content = re.sub(r'\n\n\n+', '\n\n', new_content)
-    
-    # Write back to file
-    with open(app_py_path, 'w', encoding='utf-8') as f:
-        f.write(new_content)
+    return re.sub(r'\n\n\n+', '\n\n', new_content)
+
+# Held for every read-modify-write of app.py, so two edits never read a half-written file or drop each other's routes
+_app_py_lock = threading.RLock()
+
+def write_api_to_file(endpoint, function_name, code):
+    """Write API code to app.py file for persistence"""
+    with _app_py_lock:
+        write_app_py(insert_api_code(read_app_py(), endpoint, function_name, code))
+
+def update_api_code_in_file(endpoint, function_name, new_code):
+    """Update existing API code in app.py file"""
+    with _app_py_lock:
+        write_app_py(replace_api_code(read_app_py(), endpoint, function_name, new_code))
+
+def remove_api_from_file(endpoint, function_name):
+    """Remove API code from app.py file"""
+    with _app_py_lock:
+        write_app_py(strip_api_code(read_app_py(), endpoint, function_name))
 
 # System APIs go here
 @app.route('/')
@@ -275,20 +340,22 @@ def signup():
     password = data.get('password')
     name = data.get('name')
     user_db[username] = {"password": password, "name": name, "email": username, "dash_preferences": {}, "APIs": {}, "files": {}}
-    save_server()
+    save_server(username)
     return jsonify({"message": "Signup successful"}), 200
 
 @app.route('/get_apis', methods=['POST'])
 def get_apis():
     data = request.get_json()
     username = data.get('username')
-    return jsonify({"APIs": user_db[username]['APIs']}), 200
+    with user_lock(username):
+        return jsonify({"APIs": user_db[username]['APIs']}), 200
 
 @app.route('/get_files', methods=['POST'])
 def get_files():
     data = request.get_json()
     username = data.get('username')
-    return jsonify({"files": user_db[username]['files']}), 200
+    with user_lock(username):
+        return jsonify({"files": user_db[username]['files']}), 200
 
 @app.route('/save_server', methods=['POST'])
 def save_server_endpoint():
@@ -298,6 +365,17 @@ def save_server_endpoint():
     except Exception as e:
         return jsonify({"error": f"Failed to save server: {str(e)}"}), 500
 
+@app.route('/add_shard', methods=['POST'])
+def add_shard():
+    """Add a shard to the user store and move the users it now owns, without stopping the server"""
+    if not isinstance(user_db, ShardedUserStore):
+        return jsonify({"error": "Sharding is disabled, set NALFLO_SHARDS to enable it"}), 400
+    try:
+        moved = user_db.add_shard()
+        return jsonify({"message": "Shard added successfully", "shards": len(user_db.shards), "moved": moved}), 200
+    except Exception as e:
+        return jsonify({"error": f"Failed to add shard: {str(e)}"}), 500
+
 @app.route('/update_api_code', methods=['POST'])
 def update_api_code():
     data = request.get_json()
@@ -308,18 +386,19 @@ def update_api_code():
     if username not in user_db:
         return jsonify({"error": "User not found"}), 404
     
-    if endpoint not in user_db[username]['APIs']:
-        return jsonify({"error": "API not found"}), 404
-    
-    # Update the code in user's API
-    user_db[username]['APIs'][endpoint]['code'] = code
+    with user_lock(username):
+        if endpoint not in user_db[username]['APIs']:
+            return jsonify({"error": "API not found"}), 404
+        
+        # Update the code in user's API
+        user_db[username]['APIs'][endpoint]['code'] = code
+        function_name = user_db[username]['APIs'][endpoint]['function_name']
     
     # Save server
-    save_server()
+    save_server(username)
     
     # Update the API code in app.py file
     try:
-        function_name = user_db[username]['APIs'][endpoint]['function_name']
         update_api_code_in_file(endpoint, function_name, code)
         return jsonify({"message": "API code updated successfully"}), 200
     except Exception as e:
@@ -338,16 +417,20 @@ def remove_api():
         return jsonify({"error": "API not found"}), 404
     
     # Save server before removal
-    save_server()
+    save_server(username)
     
-    # Get function name before removing from dict
-    function_name = user_db[username]['APIs'][endpoint]['function_name']
-    
-    # Remove from user's APIs dictionary
-    del user_db[username]['APIs'][endpoint]
+    with user_lock(username):
+        if endpoint not in user_db[username]['APIs']:
+            return jsonify({"error": "API not found"}), 404
+        
+        # Get function name before removing from dict
+        function_name = user_db[username]['APIs'][endpoint]['function_name']
+        
+        # Remove from user's APIs dictionary
+        del user_db[username]['APIs'][endpoint]
     
     # Save server after removal from dict
-    save_server()
+    save_server(username)
     
     # Remove the API code from app.py file
     try:
@@ -356,45 +439,245 @@ def remove_api():
     except Exception as e:
         return jsonify({"error": f"Failed to remove API from file: {str(e)}"}), 500
 
+def validate_bulk_api_operations(operations, default_username):
+    """Check every operation against the store as it would look after the ones before it.
+
+    Returns (errors, planned) where planned is a list of (action, username, endpoint, op).
+    """
+    # Endpoint and function name owners, built once instead of scanning all users per API
+    endpoint_owners = {}
+    function_names = set()
+    for user_email in list(user_db):
+        with user_lock(user_email):
+            user_apis = list(user_db[user_email].get('APIs', {}).items())
+        for endpoint, api_info in user_apis:
+            endpoint_owners[endpoint] = user_email
+            function_names.add(api_info.get('function_name'))
+
+    errors = []
+    planned = []
+    for i, op in enumerate(operations):
+        if not isinstance(op, dict):
+            errors.append({"index": i, "error": "Operation must be an object"})
+            continue
+        action = op.get('action')
+        username = op.get('username', default_username)
+        endpoint = op.get('endpoint')
+        if action not in ('create', 'update', 'remove'):
+            errors.append({"index": i, "error": "action must be one of create, update, remove"})
+            continue
+        if username not in user_db:
+            errors.append({"index": i, "error": "User not found"})
+            continue
+        if not isinstance(endpoint, str) or not endpoint.startswith('/'):
+            errors.append({"index": i, "error": "Endpoint must start with /"})
+            continue
+
+        if action == 'create':
+            function_name = op.get('function_name')
+            if endpoint in endpoint_owners:
+                errors.append({"index": i, "error": f"Endpoint {endpoint} already exists for user {endpoint_owners[endpoint]}"})
+                continue
+            if not isinstance(function_name, str) or not function_name.isidentifier():
+                errors.append({"index": i, "error": "function_name must be a valid Python identifier"})
+                continue
+            if function_name in function_names or function_name in globals():
+                errors.append({"index": i, "error": f"Function name {function_name} is already in use"})
+                continue
+            if not isinstance(op.get('code'), str):
+                errors.append({"index": i, "error": "code is required"})
+                continue
+            # refresh_dashboard builds the model prompt from both, so they must be strings
+            missing = [field for field in ('description', 'body_format') if not isinstance(op.get(field), str)]
+            if missing:
+                errors.append({"index": i, "error": f"{' and '.join(missing)} {'is' if len(missing) == 1 else 'are'} required"})
+                continue
+            endpoint_owners[endpoint] = username
+            function_names.add(function_name)
+        else:
+            if endpoint_owners.get(endpoint) != username:
+                errors.append({"index": i, "error": "API not found"})
+                continue
+            if action == 'update' and not isinstance(op.get('code'), str):
+                errors.append({"index": i, "error": "code is required"})
+                continue
+            if action == 'remove':
+                del endpoint_owners[endpoint]
+        planned.append((action, username, endpoint, op))
+    return errors, planned
+
+def apply_api_changes(changes):
+    """Set each {(username, endpoint): api_info} record, removing it when api_info is None.
+
+    Returns the records that were replaced in the same form, so the change can be undone.
+    """
+    previous = {}
+    for (username, endpoint), api_info in changes.items():
+        with user_lock(username):
+            apis = user_db[username]['APIs']
+            previous[(username, endpoint)] = apis.get(endpoint)
+            if api_info is None:
+                apis.pop(endpoint, None)
+            else:
+                apis[endpoint] = api_info
+    return previous
+
+@app.route('/bulk_apis', methods=['POST'])
+def bulk_apis():
+    """Create, update and remove many APIs in one transaction.
+
+    Every operation is validated before anything changes. On success app.py is
+    rewritten once, so the reloader restarts only once, and the store is saved
+    once. If either write fails, the store and app.py are left as they were.
+    """
+    data = request.get_json()
+    operations = data.get('operations')
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"error": "operations must be a non-empty list"}), 400
+
+    with _app_py_lock:
+        errors, planned = validate_bulk_api_operations(operations, data.get('username'))
+        if errors:
+            return jsonify({"error": "Validation failed, no changes were made", "errors": errors}), 400
+
+        # Stage the new API records and the new app.py in memory first
+        staged_apis = {}
+        for _, username, _, _ in planned:
+            if username not in staged_apis:
+                with user_lock(username):
+                    staged_apis[username] = dict(user_db[username]['APIs'])
+        try:
+            original_content = read_app_py()
+            content = original_content
+            for action, username, endpoint, op in planned:
+                apis = staged_apis[username]
+                if action == 'create':
+                    apis[endpoint] = {
+                        "description": op['description'],
+                        "code": op['code'],
+                        "function_name": op['function_name'],
+                        "body_format": op['body_format']
+                    }
+                    content = insert_api_code(content, endpoint, op['function_name'], op['code'])
+                elif action == 'update':
+                    apis[endpoint] = dict(apis[endpoint], code=op['code'])
+                    content = replace_api_code(content, endpoint, apis[endpoint]['function_name'], op['code'])
+                else:
+                    content = strip_api_code(content, endpoint, apis.pop(endpoint)['function_name'])
+        except Exception as e:
+            return jsonify({"error": f"Failed to prepare app.py, no changes were made: {str(e)}"}), 500
+
+        # Write app.py before touching the store, so a failed write leaves nothing to undo
+        try:
+            write_app_py(content)
+        except Exception as e:
+            return jsonify({"error": f"Failed to write APIs to file, no changes were made: {str(e)}"}), 500
+
+        # Only the endpoints this batch touched change, so concurrent edits to other APIs are kept
+        changes = {(username, endpoint): staged_apis[username].get(endpoint) for _, username, endpoint, _ in planned}
+        previous = apply_api_changes(changes)
+        try:
+            save_server(usernames=staged_apis)
+        except Exception as e:
+            apply_api_changes(previous)
+            write_app_py(original_content)
+            return jsonify({"error": f"Failed to save APIs, no changes were made: {str(e)}"}), 500
+
+    summary = {"create": 0, "update": 0, "remove": 0}
+    for action, _, _, _ in planned:
+        summary[action] += 1
+    return jsonify({"message": "Bulk API operations applied successfully", "applied": summary}), 200
+
+@app.route('/bulk_update_dash_preferences', methods=['POST'])
+def bulk_update_dash_preferences():
+    """Update many users' dash_preferences with a single save.
+
+    Each update has a username and either user_input or a dash_preferences object
+    to merge into the existing preferences.
+    """
+    data = request.get_json()
+    updates = data.get('updates')
+    if not isinstance(updates, list) or not updates:
+        return jsonify({"error": "updates must be a non-empty list"}), 400
+
+    errors = []
+    for i, update in enumerate(updates):
+        if not isinstance(update, dict):
+            errors.append({"index": i, "error": "Update must be an object"})
+        elif update.get('username') not in user_db:
+            errors.append({"index": i, "error": "User not found"})
+        elif 'user_input' not in update and not isinstance(update.get('dash_preferences'), dict):
+            errors.append({"index": i, "error": "Provide user_input or a dash_preferences object"})
+    if errors:
+        return jsonify({"error": "Validation failed, no changes were made", "errors": errors}), 400
+
+    for update in updates:
+        with user_lock(update['username']):
+            preferences = user_db[update['username']].setdefault('dash_preferences', {})
+            if isinstance(update.get('dash_preferences'), dict):
+                preferences.update(update['dash_preferences'])
+            if 'user_input' in update:
+                preferences['user_input'] = update['user_input']
+    save_server(usernames=[update['username'] for update in updates])
+    return jsonify({"message": "User dashboard configs updated successfully", "updated": len(updates)}), 200
+
 @app.route('/pinglogin', methods=['POST'])
 def pinglogin():
     data = request.get_json()
     username = data.get('username')
-    user_db[username]['last_login'] = datetime.now(timezone.utc).timestamp()
-    save_server()
+    with user_lock(username):
+        user_db[username]['last_login'] = datetime.now(timezone.utc).timestamp()
+    save_server(username)
     return jsonify({"message": "Login successful"}), 200
 
 @app.route('/get_dashboard', methods=['POST'])
+@rate_limited
 def get_dashboard():
     data = request.get_json()
     username = data.get('username')
-    if user_db[username]['latest_dashboard'] is None:
-        refresh_dashboard(username)
+    if user_db[username].get('latest_dashboard') is None:
+        # First load: the user has nothing to look at yet, so it goes ahead of refreshes
+        refresh_dashboard(username, priority=INTERACTIVE)
     elif user_db[username]['last_login'] < datetime.now(timezone.utc).timestamp() - 10800:
-        refresh_dashboard(username)
-    return jsonify({"dashboard": user_db[username]['latest_dashboard']}), 200
+        refresh_dashboard(username, priority=BACKGROUND)
+
+    entry = dashboard_cache.get(username, user_db[username].get('latest_dashboard'))
+    if request.if_none_match.contains_weak(entry["etag"]):
+        response = Response(status=304)
+    else:
+        encoding = next((e for e in SUPPORTED_ENCODINGS if request.accept_encodings[e]), "identity")
+        response = Response(dashboard_cache.body(entry, encoding), status=200, mimetype='application/json')
+        if encoding != "identity":
+            response.headers['Content-Encoding'] = encoding
+    # Weak: the identity, gzip and br bodies share one tag, so it must not claim byte equality
+    response.set_etag(entry["etag"], weak=True)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @app.route('/get_user_dash_config', methods=['POST'])
 def get_user_dash_config():
     data = request.get_json()
     username = data.get('username')
-    return jsonify({"dash_config": user_db[username]['dash_preferences']['user_input']}), 200
+    with user_lock(username):
+        return jsonify({"dash_config": user_db[username]['dash_preferences']['user_input']}), 200
 
 @app.route('/update_user_dash_config', methods=['POST'])
 def update_user_dash_config():
     data = request.get_json()
     username = data.get('username')
     user_input = data.get('user_input')
-    user_db[username]['dash_preferences']['user_input'] = user_input
-    save_server()
+    with user_lock(username):
+        user_db[username]['dash_preferences']['user_input'] = user_input
+    save_server(username)
     return jsonify({"message": "User dashboard config updated successfully"}), 200
 
 @app.route('/force_refresh_dashboard', methods=['POST'])
+@rate_limited
 def force_refresh_dashboard():
     data = request.get_json()
     username = data.get('username')
-    refresh_dashboard(username)
-    return jsonify({"message": "Dashboard refreshed successfully"}), 200
+    return refresh_dashboard(username, priority=BACKGROUND)
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8000, debug=True)
\ No newline at end of file
+    create_app().run(host='0.0.0.0', port=8000, debug=True)
\ No newline at end of file
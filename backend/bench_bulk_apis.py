@@ -0,0 +1,120 @@
+"""Benchmark /bulk_apis against a loop of single /create_api calls.
+
+Each mode runs against its own copy of the backend in a temporary directory, so
+the real app.py and server.json are never touched. The store is pre-filled with
+existing users and APIs to make save_server and the endpoint scan realistic.
+
+Usage:
+    python bench_bulk_apis.py [--apis 200] [--users 200] [--apis-per-user 5]
+"""
+import argparse
+import importlib.util
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_MODULES = ["app.py", "AIProcessor.py", "lazy_imports.py", "rate_limit.py", "snapshot.py",
+                   "dashboard_cache.py", "user_store.py"]
+
+
+def make_server(users, apis_per_user):
+    server = {}
+    for i in range(users):
+        email = f"user{i}@example.com"
+        server[email] = {
+            "password": "secret", "name": f"User {i}", "email": email,
+            "dash_preferences": {"user_input": ""}, "files": {}, "last_login": 0, "latest_dashboard": None,
+            "APIs": {
+                f"/existing_{i}_{j}": {"description": "Existing API", "code": "return jsonify({}), 200",
+                                       "function_name": f"existing_{i}_{j}", "body_format": "{}"}
+                for j in range(apis_per_user)
+            },
+        }
+    return server
+
+
+def load_backend(tmp, server, name):
+    """Copy the backend into tmp and import its app.py as a fresh module."""
+    for module in BACKEND_MODULES:
+        shutil.copy(os.path.join(BACKEND_DIR, module), tmp)
+    with open(os.path.join(tmp, "server.json"), "w") as f:
+        json.dump(server, f)
+    os.chdir(tmp)
+    sys.path.insert(0, tmp)
+    spec = importlib.util.spec_from_file_location(name, os.path.join(tmp, "app.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    sys.path.remove(tmp)
+
+    # Count persistence writes and app.py rewrites (each rewrite is one reloader restart)
+    counts = {"save_server": 0, "app_py_writes": 0}
+    save_server, write_app_py = module.save_server, module.write_app_py
+
+    def counted_save_server(*args, **kwargs):
+        counts["save_server"] += 1
+        save_server(*args, **kwargs)
+
+    def counted_write_app_py(content):
+        counts["app_py_writes"] += 1
+        write_app_py(content)
+
+    module.save_server = counted_save_server
+    module.write_app_py = counted_write_app_py
+    return module, counts
+
+
+def new_api(i):
+    return {"endpoint": f"/onboard_{i}", "function_name": f"onboard_{i}", "description": f"Onboarded API {i}",
+            "body_format": "{\"limit\": 10}", "code": "data = request.get_json()\nreturn jsonify({\"ok\": True}), 200"}
+
+
+def run_single(server, apis):
+    with tempfile.TemporaryDirectory() as tmp:
+        module, counts = load_backend(tmp, server, "bench_app_single")
+        client = module.app.test_client()
+        start = time.perf_counter()
+        for i in range(apis):
+            response = client.post('/create_api', json=dict(new_api(i), username="user0@example.com"))
+            assert response.status_code == 200, response.get_json()
+        return time.perf_counter() - start, counts
+
+
+def run_bulk(server, apis):
+    with tempfile.TemporaryDirectory() as tmp:
+        module, counts = load_backend(tmp, server, "bench_app_bulk")
+        client = module.app.test_client()
+        operations = [dict(new_api(i), action="create") for i in range(apis)]
+        start = time.perf_counter()
+        response = client.post('/bulk_apis', json={"username": "user0@example.com", "operations": operations})
+        assert response.status_code == 200, response.get_json()
+        return time.perf_counter() - start, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare bulk and single API creation")
+    parser.add_argument("--apis", type=int, default=200, help="APIs to create")
+    parser.add_argument("--users", type=int, default=200, help="Existing users in the store")
+    parser.add_argument("--apis-per-user", type=int, default=5, help="Existing APIs per user")
+    args = parser.parse_args()
+
+    server = make_server(args.users, args.apis_per_user)
+    cwd = os.getcwd()
+    try:
+        results = [("single /create_api", *run_single(server, args.apis)),
+                   ("one /bulk_apis", *run_bulk(server, args.apis))]
+    finally:
+        os.chdir(cwd)
+
+    print(f"Creating {args.apis} APIs in a store of {args.users} users x {args.apis_per_user} APIs\n")
+    print(f"{'mode':<20}{'total':>10}{'APIs/s':>10}{'saves':>8}{'app.py writes':>15}")
+    for label, seconds, counts in results:
+        print(f"{label:<20}{seconds:>9.2f}s{args.apis / seconds:>10.0f}{counts['save_server']:>8}{counts['app_py_writes']:>15}")
+    print(f"\nBulk is {results[0][1] / results[1][1]:.1f}x faster and restarts the reloader once instead of {results[0][2]['app_py_writes']} times")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Benchmark /get_dashboard polling with the response cache against plain jsonify.
+
+Polls a realistic dashboard through the Flask test client and reports bytes per
+poll and server CPU per poll for:
+  - jsonify on every call (the previous behaviour)
+  - cached body, uncompressed
+  - cached body, gzip (and br when the brotli package is installed)
+  - repeat polls that send If-None-Match and get 304
+
+Usage:
+    python bench_dashboard_cache.py [--polls 2000] [--tiles 12]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from flask import jsonify, request
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+USERNAME = "bench@nalflo.com"
+
+
+def make_dashboard(tiles):
+    html = ("<div class=\"tile-content list-tile\"><ul class=\"list-items\">"
+            + "".join(f"<li class=\"list-item\"><span class=\"list-bullet\">•</span>Event {i} processed</li>" for i in range(10))
+            + "</ul></div>")
+    return {
+        "gridSize": {"rows": 4, "cols": 8},
+        "tiles": [{"id": f"tile{t}", "title": f"Tile {t}", "coordinates": [[0, t], [1, t], [1, t], [0, t]], "html": html}
+                  for t in range(tiles)],
+        "finished_or_make_api_call": True,
+        "endpoint": "",
+        "api_body": {},
+    }
+
+
+def poll(client, path, polls, headers=None):
+    """Return (bytes per poll, CPU microseconds per poll, status code)."""
+    total_bytes = 0
+    status = None
+    start = time.process_time()
+    for _ in range(polls):
+        response = client.post(path, json={"username": USERNAME}, headers=headers or {})
+        total_bytes += len(response.get_data())
+        status = response.status_code
+    cpu = time.process_time() - start
+    return total_bytes / polls, cpu / polls * 1e6, status
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure /get_dashboard bytes and CPU per poll")
+    parser.add_argument("--polls", type=int, default=2000)
+    parser.add_argument("--tiles", type=int, default=12)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            sys.path.insert(0, BACKEND_DIR)
+            import app as backend
+            import rate_limit
+
+            # Polling on purpose, so lift the per-user limit for this process
+            rate_limit.RATE_LIMITS.pop("/get_dashboard", None)
+
+            backend.ensure_user_db()
+            backend.user_db[USERNAME] = dict(backend.default_user_db()["demo@nalflo.com"], email=USERNAME,
+                                             last_login=time.time(), latest_dashboard=make_dashboard(args.tiles))
+
+            @backend.app.route('/bench_get_dashboard_jsonify', methods=['POST'])
+            def bench_get_dashboard_jsonify():
+                username = request.get_json().get('username')
+                return jsonify({"dashboard": backend.user_db[username]['latest_dashboard']}), 200
+
+            client = backend.app.test_client()
+            etag = client.post('/get_dashboard', json={"username": USERNAME}).headers['ETag']
+
+            rows = [
+                ("jsonify every poll", *poll(client, '/bench_get_dashboard_jsonify', args.polls)),
+                ("cached, identity", *poll(client, '/get_dashboard', args.polls)),
+            ]
+            for encoding in backend.SUPPORTED_ENCODINGS:
+                rows.append((f"cached, {encoding}", *poll(client, '/get_dashboard', args.polls, {"Accept-Encoding": encoding})))
+            rows.append(("If-None-Match (304)", *poll(client, '/get_dashboard', args.polls, {"If-None-Match": etag})))
+        finally:
+            os.chdir(cwd)
+
+    print(f"{args.polls} polls of a {args.tiles}-tile dashboard\n")
+    print(f"{'mode':<22}{'status':>8}{'bytes/poll':>12}{'CPU/poll':>12}")
+    for label, size, cpu_us, status in rows:
+        print(f"{label:<22}{status:>8}{size:>12.0f}{cpu_us:>10.0f}us")
+    print("\nCPU per poll includes the test client's request handling, which is the same for every mode.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Benchmark model tiering of the dashboard conversation against a mock model.
+
+Runs call_ai with every turn on the large model (tiered_models=False) and with
+TURN_POLICY tiering, using a mock Gemini whose latency and token usage depend on
+the model and thinking budget. No API key or network access is needed.
+
+Latency is simulated with time.sleep scaled by --time-scale and reported back in
+unscaled seconds. Prices are per million tokens and only illustrative; update
+MOCK_MODELS to match current pricing.
+
+Usage:
+    python bench_model_tiering.py [--api-calls 3] [--runs 3] [--time-scale 0.01]
+"""
+import argparse
+import contextlib
+import io
+import json
+import time
+
+import AIProcessor as ai
+
+MOCK_MODELS = {
+    "gemini-2.5-pro": {"overhead": 1.5, "tokens_per_second": 120, "dynamic_thinking": 4000, "input_price": 1.25, "output_price": 10.0},
+    "gemini-2.5-flash": {"overhead": 0.5, "tokens_per_second": 300, "dynamic_thinking": 2000, "input_price": 0.30, "output_price": 2.50},
+}
+
+# Output tokens of a turn that picks an API call vs one that lays out the tiles
+API_CALL_OUTPUT_TOKENS = 120
+LAYOUT_OUTPUT_TOKENS = 3000
+
+
+class MockProcessor(ai.AIProcessor):
+    def __init__(self, api_calls, time_scale, tiered_models=True):
+        super().__init__(tiered_models=tiered_models)
+        self.api_calls = api_calls
+        self.time_scale = time_scale
+        self.cost = 0.0
+
+    def make_api_call(self, endpoint, api_body):
+        return {"success": True, "status_code": 200, "data": {"rows": [1, 2, 3]}, "text": "{}"}
+
+    def stream_model_text(self, model, thinking_budget, system_instruction, input_text):
+        profile = MOCK_MODELS[model]
+        calls_made = system_instruction.count("API Call to ")
+        selection_only = ai.TURN_POLICY[ai.API_SELECTION]["instruction"] in input_text
+
+        if calls_made < self.api_calls:
+            output_tokens = API_CALL_OUTPUT_TOKENS
+            response = {"gridSize": {"rows": 0, "cols": 0}, "tiles": [], "finished_or_make_api_call": False,
+                         "endpoint": f"/api{calls_made}", "api_body": "{'limit': 10}"}
+        else:
+            output_tokens = API_CALL_OUTPUT_TOKENS if selection_only else LAYOUT_OUTPUT_TOKENS
+            tiles = [] if selection_only else [
+                {"id": f"tile{i}", "title": f"Tile {i}", "coordinates": f"[[0, {i}], [1, {i}], [1, {i}], [0, {i}]]", "html": "<div></div>"}
+                for i in range(8)
+            ]
+            response = {"gridSize": {"rows": 4, "cols": 8}, "tiles": tiles, "finished_or_make_api_call": True,
+                        "endpoint": "", "api_body": "{}"}
+
+        thinking_tokens = profile["dynamic_thinking"] if thinking_budget < 0 else min(thinking_budget, profile["dynamic_thinking"])
+        input_tokens = (len(system_instruction) + len(input_text)) // 4
+        seconds = profile["overhead"] + (thinking_tokens + output_tokens) / profile["tokens_per_second"]
+        time.sleep(seconds * self.time_scale)
+
+        self.cost += (input_tokens * profile["input_price"] + (thinking_tokens + output_tokens) * profile["output_price"]) / 1e6
+        return json.dumps(response), input_tokens + thinking_tokens + output_tokens
+
+
+def run(label, api_calls, runs, time_scale, tiered_models):
+    totals = {}
+    latency = 0.0
+    cost = 0.0
+    for _ in range(runs):
+        processor = MockProcessor(api_calls, time_scale, tiered_models=tiered_models)
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = processor.call_ai(user_preferences={"user_input": "Revenue first"},
+                                       apis_available={f"/api{i}": "Returns data" for i in range(api_calls)})
+        assert result["finished_or_make_api_call"] and result["tiles"], "mock conversation did not finish"
+        for turn in processor.last_turn_log:
+            key = (turn["turn_type"], turn["model"])
+            count, seconds = totals.get(key, (0, 0.0))
+            totals[key] = (count + 1, seconds + turn["seconds"] / time_scale)
+            latency += turn["seconds"] / time_scale
+        cost += processor.cost
+    return label, totals, latency / runs, cost / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare single-model and tiered dashboard generation")
+    parser.add_argument("--api-calls", type=int, default=3)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--time-scale", type=float, default=0.01)
+    args = parser.parse_args()
+
+    results = [
+        run("single model", args.api_calls, args.runs, args.time_scale, tiered_models=False),
+        run("tiered", args.api_calls, args.runs, args.time_scale, tiered_models=True),
+    ]
+
+    print(f"\n{args.api_calls} API calls per dashboard, averaged over {args.runs} runs\n")
+    for label, totals, latency, cost in results:
+        print(f"{label}: {latency:.1f}s model latency, ${cost:.4f} per dashboard")
+        for (turn_type, model), (count, seconds) in sorted(totals.items()):
+            print(f"    {turn_type:<14} {model:<18} {count / args.runs:>4.1f} turns  {seconds / args.runs:>6.1f}s")
+    baseline, tiered = results
+    print(f"\nTiering saves {baseline[2] - tiered[2]:.1f}s ({1 - tiered[2] / baseline[2]:.0%}) and "
+          f"${baseline[3] - tiered[3]:.4f} ({1 - tiered[3] / baseline[3]:.0%}) per dashboard")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Multi-threaded write throughput of the sharded user store.
+
+Each thread repeatedly updates a random user and saves that user's shard,
+the same pattern as /pinglogin and /update_user_dash_config. The store is
+rebuilt for every shard count in a temporary directory.
+
+Usage:
+    python bench_sharding.py [--users 2000] [--threads 8] [--writes 50] [--shards 1,2,4,8]
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from user_store import ShardedUserStore
+
+
+def make_user(i):
+    email = f"user{i}@tenant{i % 50}.com"
+    return email, {
+        "password": "secret", "name": f"User {i}", "email": email,
+        "dash_preferences": {"user_input": "Revenue first, then support tickets."},
+        "APIs": {f"/user{i}_api{j}": {"description": "Returns data", "code": "return jsonify({}), 200",
+                                      "function_name": f"user{i}_api{j}", "body_format": "{}"} for j in range(3)},
+        "files": {}, "last_login": 0.0, "latest_dashboard": None,
+    }
+
+
+def run(shard_count, users, threads, writes, fmt):
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ShardedUserStore(os.path.join(tmp, "shards"), shard_count, fmt=fmt)
+        store.load(dict(make_user(i) for i in range(users)))
+        usernames = list(store)
+
+        def writer(seed):
+            rng = random.Random(seed)
+            for _ in range(writes):
+                username = rng.choice(usernames)
+                store[username]["last_login"] = time.time()
+                store.save([username])
+
+        workers = [threading.Thread(target=writer, args=(seed,)) for seed in range(threads)]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return threads * writes / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure write throughput by shard count")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=50, help="Writes per thread")
+    parser.add_argument("--shards", default="1,2,4,8")
+    parser.add_argument("--format", choices=["json", "snapshot"], default="json")
+    args = parser.parse_args()
+
+    print(f"{args.users} users, {args.threads} threads x {args.writes} writes, {args.format} shards\n")
+    print(f"{'shards':>6}{'writes/s':>12}{'speedup':>10}")
+    baseline = None
+    for shard_count in [int(n) for n in args.shards.split(",")]:
+        throughput = run(shard_count, args.users, args.threads, args.writes, args.format)
+        baseline = baseline or throughput
+        print(f"{shard_count:>6}{throughput:>12.0f}{throughput / baseline:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
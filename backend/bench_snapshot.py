@@ -0,0 +1,120 @@
+"""Benchmark the snapshot format against the indented server.json.
+
+Builds a synthetic tenant and compares file size, save time, full load time,
+single-user load time and peak allocations of both formats.
+
+Usage:
+    python bench_snapshot.py [--users 2000] [--apis 5] [--tiles 12] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import snapshot
+
+
+def make_user_db(users, apis, tiles):
+    tile_html = "<div class=\"tile-content metric-tile\"><div class=\"metric-value\">1,234</div><div class=\"metric-label\">Active Users</div></div>"
+    user_db = {}
+    for i in range(users):
+        email = f"user{i}@example.com"
+        user_db[email] = {
+            "password": f"password{i}",
+            "name": f"User {i}",
+            "email": email,
+            "dash_preferences": {"user_input": "Show revenue first, then support tickets and deploys."},
+            "APIs": {
+                f"/user{i}_api{j}": {
+                    "description": f"Returns data set {j} for user {i}",
+                    "code": "data = request.get_json()\nreturn jsonify({\"rows\": [1, 2, 3]}), 200",
+                    "function_name": f"user{i}_api{j}",
+                    "body_format": "{\"limit\": 10}",
+                }
+                for j in range(apis)
+            },
+            "files": {},
+            "last_login": 1700000000.0 + i,
+            "latest_dashboard": {
+                "gridSize": {"rows": 4, "cols": 8},
+                "tiles": [
+                    {"id": f"tile{t}", "title": f"Tile {t}", "coordinates": [[0, t], [1, t], [1, t], [0, t]], "html": tile_html}
+                    for t in range(tiles)
+                ],
+                "finished_or_make_api_call": True,
+                "endpoint": "",
+                "api_body": "",
+            },
+        }
+    return user_db
+
+
+def measure(fn, repeat):
+    """Return (best seconds, peak traced bytes) over repeat runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def save_json(user_db, path):
+    with open(path, "w") as f:
+        json.dump(user_db, f, indent=2)
+
+
+def load_json(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def load_one_json(path, username):
+    return load_json(path).get(username)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare server.json and snapshot formats")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--apis", type=int, default=5)
+    parser.add_argument("--tiles", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    user_db = make_user_db(args.users, args.apis, args.tiles)
+    target = f"user{args.users // 2}@example.com"
+    codec = "msgpack" if snapshot.msgpack is not None else "json records"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_path = os.path.join(tmp, "server.json")
+        snap_path = os.path.join(tmp, "server.snap")
+
+        results = [
+            ("server.json", json_path,
+             measure(lambda: save_json(user_db, json_path), args.repeat),
+             measure(lambda: load_json(json_path), args.repeat),
+             measure(lambda: load_one_json(json_path, target), args.repeat)),
+            (f"snapshot ({codec})", snap_path,
+             measure(lambda: snapshot.write_snapshot(snap_path, user_db.items()), args.repeat),
+             measure(lambda: snapshot.load_all(snap_path), args.repeat),
+             measure(lambda: snapshot.load_user(snap_path, target), args.repeat)),
+        ]
+
+        print(f"{args.users} users, {args.apis} APIs and {args.tiles} tiles each (best of {args.repeat})\n")
+        print(f"{'format':<26}{'size':>10}{'save':>10}{'save peak':>12}{'load all':>10}{'load peak':>12}{'load one':>10}")
+        for name, path, save, load, load_one in results:
+            size_mb = os.path.getsize(path) / 1e6
+            print(f"{name:<26}{size_mb:>8.2f}MB"
+                  f"{save[0] * 1000:>8.1f}ms{save[1] / 1e6:>10.2f}MB"
+                  f"{load[0] * 1000:>8.1f}ms{load[1] / 1e6:>10.2f}MB"
+                  f"{load_one[0] * 1000:>8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
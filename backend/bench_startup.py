@@ -0,0 +1,90 @@
+"""Startup benchmark for the backend.
+
+Runs `python -X importtime -c "import app"` in a fresh interpreter several times
+and checks the cumulative import time of app.py against a budget.
+
+Usage:
+    python bench_startup.py [--runs 5] [--budget-ms 250] [--top 10]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules that must not be imported while app.py is being imported
+DEFERRED_MODULES = ["google.genai", "requests", "dotenv"]
+
+
+def run_importtime():
+    """Import app.py in a fresh interpreter and return (wall_ms, importtime rows)."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing app.py failed:\n{result.stderr}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return wall_ms, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure app.py import time")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=250.0,
+                        help="Maximum allowed median cumulative import time of app.py")
+    parser.add_argument("--top", type=int, default=10,
+                        help="Number of slowest imports to list from the last run")
+    args = parser.parse_args()
+
+    app_times = []
+    wall_times = []
+    rows = []
+    for _ in range(args.runs):
+        wall_ms, rows = run_importtime()
+        wall_times.append(wall_ms)
+        app_row = [row for row in rows if row[2].strip() == "app"]
+        app_times.append(app_row[-1][1] / 1000 if app_row else 0.0)
+
+    app_times.sort()
+    wall_times.sort()
+    median_app = app_times[len(app_times) // 2]
+    median_wall = wall_times[len(wall_times) // 2]
+
+    print(f"Runs: {args.runs}")
+    print(f"import app (cumulative): median {median_app:.1f} ms, min {app_times[0]:.1f} ms, max {app_times[-1]:.1f} ms")
+    print(f"Interpreter wall time:   median {median_wall:.1f} ms")
+
+    print(f"\nSlowest {args.top} imports (cumulative, last run):")
+    for self_us, cumulative_us, name in sorted(rows, key=lambda r: r[1], reverse=True)[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    imported = {row[2].strip() for row in rows}
+    eager = [module for module in DEFERRED_MODULES if module in imported]
+
+    failed = False
+    if eager:
+        print(f"\nFAIL: deferred modules imported eagerly: {', '.join(eager)}")
+        failed = True
+    if median_app > args.budget_ms:
+        print(f"\nFAIL: median import time {median_app:.1f} ms exceeds budget of {args.budget_ms:.0f} ms")
+        failed = True
+    if not failed:
+        print(f"\nOK: within budget of {args.budget_ms:.0f} ms")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import gzip
+import hashlib
+import json
+import threading
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Best encoding first; br is only offered when the brotli package is installed
+SUPPORTED_ENCODINGS = (["br"] if brotli is not None else []) + ["gzip"]
+
+
+class DashboardResponseCache:
+    """Serialized /get_dashboard bodies per user, with their ETag and compressed variants.
+
+    An entry is built once per dashboard and reused by every poll until
+    invalidate() is called or the user's latest_dashboard object is replaced.
+    Compressed variants are produced the first time a client asks for them.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, username, dashboard):
+        with self.lock:
+            entry = self.entries.get(username)
+            if entry is None or entry["dashboard"] is not dashboard:
+                body = json.dumps({"dashboard": dashboard}, separators=(",", ":")).encode("utf-8")
+                entry = {
+                    "dashboard": dashboard,
+                    "etag": hashlib.sha1(body).hexdigest(),
+                    "bodies": {"identity": body},
+                }
+                self.entries[username] = entry
+            return entry
+
+    def body(self, entry, encoding):
+        """Return the entry's body in the given encoding, compressing it on first use."""
+        with self.lock:
+            if encoding not in entry["bodies"]:
+                raw = entry["bodies"]["identity"]
+                if encoding == "br":
+                    entry["bodies"][encoding] = brotli.compress(raw, quality=5)
+                else:
+                    entry["bodies"][encoding] = gzip.compress(raw, compresslevel=6)
+            return entry["bodies"][encoding]
+
+    def invalidate(self, username):
+        with self.lock:
+            self.entries.pop(username, None)
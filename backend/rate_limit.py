@@ -0,0 +1,193 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, jsonify
+
+# Admission priorities for Gemini calls, lower runs first
+INTERACTIVE = 0
+BACKGROUND = 1
+
+# Token bucket settings per endpoint: "per_user" limits one user, "per_client" one
+# remote address whatever usernames it sends, and "global" the endpoint across all
+# users. capacity is the burst size, per_seconds the time it takes to refill a full bucket.
+RATE_LIMITS = {
+    "/force_refresh_dashboard": {
+        "per_user": {"capacity": 2, "per_seconds": 300},
+        "per_client": {"capacity": 6, "per_seconds": 300},
+        "global": {"capacity": 20, "per_seconds": 60},
+    },
+    "/get_dashboard": {
+        "per_user": {"capacity": 10, "per_seconds": 60},
+        "per_client": {"capacity": 30, "per_seconds": 60},
+        "global": {"capacity": 300, "per_seconds": 60},
+    },
+}
+
+# Buckets that have refilled are dropped every PRUNE_SECONDS (a full bucket is the
+# same as a new one); beyond MAX_BUCKETS the least recently used are dropped too
+PRUNE_SECONDS = 60
+MAX_BUCKETS = 100000
+
+
+class OverBudget(Exception):
+    """Raised when a Gemini call cannot be admitted within its budget."""
+
+
+class TokenBucket:
+    def __init__(self, capacity, per_seconds):
+        self.capacity = capacity
+        self.rate = capacity / per_seconds
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_consume(self, amount=1):
+        """Take amount tokens if available. Returns 0 on success, otherwise the seconds until they will be."""
+        with self.lock:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return 0
+            return (amount - self.tokens) / self.rate
+
+    def wait_time(self, amount=1):
+        """Seconds until amount tokens are available, without consuming them."""
+        with self.lock:
+            self._refill()
+            if self.tokens >= amount:
+                return 0
+            return (amount - self.tokens) / self.rate
+
+    def is_full(self):
+        with self.lock:
+            self._refill()
+            return self.tokens >= self.capacity
+
+    def refund(self, amount):
+        """Return tokens to the bucket (negative amounts charge extra usage)."""
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RateLimiter:
+    """Keeps one token bucket per (user, endpoint), per (client, endpoint) and per endpoint."""
+
+    def __init__(self, limits, max_buckets=MAX_BUCKETS, prune_seconds=PRUNE_SECONDS):
+        self.limits = limits
+        self.max_buckets = max_buckets
+        self.prune_seconds = prune_seconds
+        self.buckets = OrderedDict()
+        self.pruned = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _bucket(self, key, settings):
+        with self.lock:
+            now = time.monotonic()
+            if now - self.pruned >= self.prune_seconds:
+                self.pruned = now
+                for full_key in [k for k, bucket in self.buckets.items() if bucket.is_full()]:
+                    del self.buckets[full_key]
+            if key in self.buckets:
+                self.buckets.move_to_end(key)
+            else:
+                self.buckets[key] = TokenBucket(settings["capacity"], settings["per_seconds"])
+                if len(self.buckets) > self.max_buckets:
+                    self.buckets.popitem(last=False)
+            return self.buckets[key]
+
+    def check(self, endpoint, user, client):
+        """Consume one request for user from client on endpoint. Returns 0 if allowed, otherwise seconds to retry after."""
+        settings = self.limits.get(endpoint)
+        if settings is None:
+            return 0
+        consumed = []
+        for key, scope in ((("user", user, endpoint), "per_user"),
+                           (("client", client, endpoint), "per_client"),
+                           (("global", endpoint), "global")):
+            bucket = self._bucket(key, settings[scope])
+            retry_after = bucket.try_consume()
+            if retry_after:
+                # The request never ran, so give back the tokens already taken
+                for taken in consumed:
+                    taken.refund(1)
+                return retry_after
+            consumed.append(bucket)
+        return 0
+
+
+limiter = RateLimiter(RATE_LIMITS)
+
+
+def rate_limited(f):
+    """Reject requests over the RATE_LIMITS for this endpoint with 429 and Retry-After."""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        data = request.get_json(silent=True) or {}
+        # The username is chosen by the client, so the remote address is limited as well
+        user = data.get('username') or request.remote_addr
+        retry_after = limiter.check(request.path, user, request.remote_addr)
+        if retry_after:
+            response = jsonify({"error": "Rate limit exceeded, try again later", "retry_after": round(retry_after, 1)})
+            response.headers['Retry-After'] = str(int(retry_after) + 1)
+            return response, 429
+        return f(*args, **kwargs)
+    return wrapper
+
+
+class AdmissionController:
+    """Global concurrency and tokens-per-minute budget for model calls.
+
+    Waiting callers are admitted in priority order (INTERACTIVE before BACKGROUND,
+    then first come first served). A caller that cannot be admitted before its
+    timeout raises OverBudget so the caller can shed load.
+    """
+
+    def __init__(self, max_concurrency, tokens_per_minute):
+        self.max_concurrency = max_concurrency
+        self.tokens = TokenBucket(tokens_per_minute, 60)
+        self.active = 0
+        self.waiting = []
+        self.counter = itertools.count()
+        self.cond = threading.Condition()
+
+    def acquire(self, priority, tokens, timeout):
+        if tokens > self.tokens.capacity:
+            raise OverBudget(f"Request of {tokens} tokens exceeds the per-minute budget")
+        deadline = time.monotonic() + timeout
+        entry = (priority, next(self.counter))
+        with self.cond:
+            heapq.heappush(self.waiting, entry)
+            try:
+                while True:
+                    wait = None
+                    if self.waiting[0] == entry and self.active < self.max_concurrency:
+                        wait = self.tokens.try_consume(tokens)
+                        if not wait:
+                            self.active += 1
+                            return
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or (wait and wait > remaining):
+                        raise OverBudget("Gemini budget exhausted, request shed")
+                    self.cond.wait(min(remaining, wait) if wait else remaining)
+            finally:
+                self.waiting.remove(entry)
+                heapq.heapify(self.waiting)
+                self.cond.notify_all()
+
+    def release(self, estimated_tokens=0, actual_tokens=None):
+        """Free a concurrency slot and settle the token estimate against actual usage."""
+        if actual_tokens is not None:
+            self.tokens.refund(estimated_tokens - actual_tokens)
+        with self.cond:
+            self.active -= 1
+            self.cond.notify_all()
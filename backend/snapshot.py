@@ -0,0 +1,165 @@
+"""Compact binary snapshot format for the user store.
+
+Layout:
+    header   MAGIC (8 bytes) + codec (1 byte, b"j" = JSON, b"m" = msgpack)
+    records  for each user: record length (uint32) + encoded record
+    index    JSON object {username: [offset, length]} pointing at the records
+    footer   index offset (uint64) + index length (uint32) + MAGIC
+
+Records are written one at a time, so a snapshot never needs the whole store
+encoded in memory, and the index lets a single user be read without decoding
+any other record. msgpack is used when it is installed, otherwise compact JSON.
+
+Usage:
+    python snapshot.py import server.json server.snap
+    python snapshot.py export server.snap server.json
+"""
+import json
+import os
+import struct
+import sys
+
+MAGIC = b"NLFSNAP1"
+RECORD_HEADER = struct.Struct("<I")
+FOOTER = struct.Struct("<QI8s")
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class SnapshotError(Exception):
+    """Raised when a file is not a valid snapshot."""
+
+
+def _encoder(codec):
+    if codec == b"m":
+        return lambda record: msgpack.packb(record, use_bin_type=True)
+    return lambda record: json.dumps(record, separators=(",", ":")).encode("utf-8")
+
+
+def _decoder(codec):
+    if codec == b"m":
+        if msgpack is None:
+            raise SnapshotError("Snapshot was written with msgpack, which is not installed")
+        return lambda data: msgpack.unpackb(data, raw=False)
+    return lambda data: json.loads(data)
+
+
+def default_codec():
+    return b"m" if msgpack is not None else b"j"
+
+
+def encode_records(items, codec=None):
+    """Encode (username, record) pairs up front, e.g. while holding the lock that guards the records.
+
+    Returns (codec, encoded pairs) for write_encoded.
+    """
+    if codec is None:
+        codec = default_codec()
+    encode = _encoder(codec)
+    return codec, [(username, encode(record)) for username, record in items]
+
+
+def write_snapshot(path, items, codec=None):
+    """Stream (username, record) pairs into a snapshot at path.
+
+    The file is written next to path and moved into place once complete, so a
+    crash mid-write never leaves a truncated snapshot behind.
+    """
+    if codec is None:
+        codec = default_codec()
+    encode = _encoder(codec)
+    write_encoded(path, codec, ((username, encode(record)) for username, record in items))
+
+
+def write_encoded(path, codec, encoded_items):
+    """Write (username, encoded record) pairs from encode_records into a snapshot at path."""
+    index = {}
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC + codec)
+        offset = len(MAGIC) + 1
+        for username, data in encoded_items:
+            f.write(RECORD_HEADER.pack(len(data)))
+            f.write(data)
+            index[username] = [offset + RECORD_HEADER.size, len(data)]
+            offset += RECORD_HEADER.size + len(data)
+        index_data = json.dumps(index, separators=(",", ":")).encode("utf-8")
+        f.write(index_data)
+        f.write(FOOTER.pack(offset, len(index_data), MAGIC))
+    os.replace(tmp_path, path)
+
+
+def _read_header_and_index(f):
+    if f.read(len(MAGIC)) != MAGIC:
+        raise SnapshotError("Not a snapshot file")
+    codec = f.read(1)
+    f.seek(-FOOTER.size, os.SEEK_END)
+    index_offset, index_length, magic = FOOTER.unpack(f.read(FOOTER.size))
+    if magic != MAGIC:
+        raise SnapshotError("Snapshot footer is missing or corrupt")
+    f.seek(index_offset)
+    return codec, json.loads(f.read(index_length))
+
+
+def read_index(path):
+    """Return {username: [offset, length]} without decoding any record."""
+    with open(path, "rb") as f:
+        return _read_header_and_index(f)[1]
+
+
+def load_user(path, username):
+    """Load a single user's record, or None if the user is not in the snapshot."""
+    with open(path, "rb") as f:
+        codec, index = _read_header_and_index(f)
+        if username not in index:
+            return None
+        offset, length = index[username]
+        f.seek(offset)
+        return _decoder(codec)(f.read(length))
+
+
+def iter_records(path):
+    """Yield (username, record) pairs in the order they were written."""
+    with open(path, "rb") as f:
+        codec, index = _read_header_and_index(f)
+        decode = _decoder(codec)
+        for username, (offset, length) in index.items():
+            f.seek(offset)
+            yield username, decode(f.read(length))
+
+
+def load_all(path):
+    return dict(iter_records(path))
+
+
+def export_json(snapshot_path, json_path, indent=2):
+    """Write a snapshot out as plain JSON, in the same layout save_server uses, one record at a time."""
+    with open(json_path, "w") as f:
+        f.write("{")
+        first = True
+        for username, record in iter_records(snapshot_path):
+            f.write("\n" if first else ",\n")
+            first = False
+            # Encoded JSON strings never contain raw newlines, so re-indenting line by line is safe
+            encoded = json.dumps(record, indent=indent).replace("\n", "\n" + " " * indent)
+            f.write(f"{' ' * indent}{json.dumps(username)}: {encoded}")
+        f.write("\n}" if not first else "}")
+
+
+def import_json(json_path, snapshot_path, codec=None):
+    with open(json_path, "r") as f:
+        data = json.load(f)
+    write_snapshot(snapshot_path, data.items(), codec=codec)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] not in ("import", "export"):
+        print(__doc__)
+        sys.exit(1)
+    if sys.argv[1] == "import":
+        import_json(sys.argv[2], sys.argv[3])
+    else:
+        export_json(sys.argv[2], sys.argv[3])
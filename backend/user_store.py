@@ -0,0 +1,320 @@
+"""Sharded user store.
+
+Users are spread over shards with a consistent hash ring keyed by username, or
+by tenant (the email domain) so a tenant's users share a shard. Each shard has
+its own lock and its own file, so saving one user's shard does not wait on or
+rewrite any other shard.
+
+ShardedUserStore behaves like the user_db dict, so existing code and generated
+API routes keep using user_db[username][...] unchanged. Code that changes a
+record in place should do so inside user_db.locked(username), which holds the
+same shard lock that save() encodes the shard under.
+
+Shards can be added while the server is running. New writes go to the new
+owner immediately, reads check the previous owner first and then the new one
+until a record has been moved, and only the records whose owner changed are
+moved (about 1/N of them).
+"""
+import bisect
+import contextlib
+import hashlib
+import json
+import os
+import threading
+from collections.abc import MutableMapping
+
+import snapshot
+
+# Points per shard on the hash ring; more points spread users more evenly
+VIRTUAL_NODES = 64
+
+
+def stable_hash(value):
+    """Hash that is the same in every process, unlike the builtin hash()."""
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def build_ring(shard_ids):
+    ring = []
+    for shard_id in shard_ids:
+        for v in range(VIRTUAL_NODES):
+            ring.append((stable_hash(f"shard-{shard_id}-{v}"), shard_id))
+    ring.sort()
+    return ring
+
+
+class Shard:
+    def __init__(self, shard_id, path, fmt):
+        self.id = shard_id
+        self.path = path
+        self.format = fmt
+        self.users = {}
+        # Guards users and their records; save_lock keeps two saves of this shard from writing the file at once
+        self.lock = threading.RLock()
+        self.save_lock = threading.Lock()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return {}
+        if self.format == "snapshot":
+            return snapshot.load_all(self.path)
+        with open(self.path, "r") as f:
+            return json.load(f)
+
+    def save(self):
+        """Encode the records under lock, so no handler can change them mid-encode, then write the file."""
+        with self.save_lock:
+            with self.lock:
+                if self.format == "snapshot":
+                    codec, encoded = snapshot.encode_records(self.users.items())
+                else:
+                    data = json.dumps(self.users, indent=2)
+            if self.format == "snapshot":
+                snapshot.write_encoded(self.path, codec, encoded)
+                return
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+
+
+class ShardedUserStore(MutableMapping):
+    def __init__(self, directory, shard_count=1, shard_key="username", fmt="json"):
+        self.directory = directory
+        self.shard_count = shard_count
+        self.shard_key = shard_key
+        self.format = fmt
+        self.shards = {}
+        self.ring = []
+        self.previous_ring = None
+        self.rebalance_lock = threading.Lock()
+
+    # Shard map
+
+    @property
+    def map_path(self):
+        return os.path.join(self.directory, "shard_map.json")
+
+    def _shard_path(self, shard_id, fmt=None):
+        extension = "snap" if (fmt or self.format) == "snapshot" else "json"
+        return os.path.join(self.directory, f"shard-{shard_id}.{extension}")
+
+    def save_shard_map(self):
+        shard_map = {"shard_key": self.shard_key, "format": self.format, "virtual_nodes": VIRTUAL_NODES, "shards": sorted(self.shards)}
+        tmp_path = self.map_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(shard_map, f, indent=2)
+        os.replace(tmp_path, self.map_path)
+
+    def _route_key(self, username):
+        if self.shard_key == "tenant" and "@" in username:
+            return username.rsplit("@", 1)[1].lower()
+        return username
+
+    def _owner(self, username, ring):
+        point = stable_hash(self._route_key(username))
+        index = bisect.bisect(ring, (point,)) % len(ring)
+        return self.shards[ring[index][1]]
+
+    def shard_for(self, username):
+        return self._owner(username, self.ring)
+
+    @contextlib.contextmanager
+    def _locked(self, *shards):
+        """Lock several shards, always in shard id order so two callers cannot deadlock."""
+        with contextlib.ExitStack() as stack:
+            for shard in sorted(set(shards), key=lambda s: s.id):
+                stack.enter_context(shard.lock)
+            yield
+
+    # Loading and saving
+
+    def load(self, legacy_users=None):
+        """Load every shard listed in the shard map, creating the map on first start.
+
+        legacy_users seeds a brand new store, e.g. from an existing server.json.
+        If shard_count is higher than the stored map, shards are added until it matches.
+        The map's shard key always wins, and shards are never removed.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        map_exists = os.path.exists(self.map_path)
+        if map_exists:
+            with open(self.map_path, "r") as f:
+                shard_map = json.load(f)
+            shard_ids = shard_map["shards"]
+            if shard_map["shard_key"] != self.shard_key:
+                print(f"Warning: shard key is set to {self.shard_key} but {self.map_path} was built with "
+                      f"{shard_map['shard_key']}; using {shard_map['shard_key']} (changing the key of an existing store is not supported)")
+                self.shard_key = shard_map["shard_key"]
+            if self.shard_count < len(shard_ids):
+                print(f"Warning: shard count is set to {self.shard_count} but {self.map_path} has {len(shard_ids)} shards; "
+                      f"keeping {len(shard_ids)} (shards can be added but not removed)")
+            stored_format = shard_map.get("format") or self._detect_format(shard_ids)
+        else:
+            shard_ids = list(range(self.shard_count))
+            stored_format = self.format
+
+        for shard_id in shard_ids:
+            self.shards[shard_id] = Shard(shard_id, self._shard_path(shard_id), self.format)
+        self.ring = build_ring(shard_ids)
+
+        if map_exists:
+            if stored_format != self.format:
+                self._migrate_format(stored_format)
+            missing = [shard.path for shard in self.shards.values() if not os.path.exists(shard.path)]
+            if missing:
+                raise RuntimeError(f"Shard map {self.map_path} lists shards with no file: {', '.join(missing)}")
+
+        misplaced = []
+        for shard in self.shards.values():
+            for username, record in shard.load().items():
+                if self.shard_for(username) is shard:
+                    shard.users[username] = record
+                else:
+                    # Left behind by an interrupted rebalance; the owner's copy wins
+                    misplaced.append((username, record))
+        for username, record in misplaced:
+            self.shard_for(username).users.setdefault(username, record)
+
+        if not os.path.exists(self.map_path):
+            for username, record in (legacy_users or {}).items():
+                self[username] = record
+            self.save()
+            self.save_shard_map()
+
+        while len(self.shards) < self.shard_count:
+            self.add_shard()
+
+    def _detect_format(self, shard_ids):
+        """Format of a shard map written before the map recorded it, judged by which files exist."""
+        for fmt in ("json", "snapshot"):
+            if all(os.path.exists(self._shard_path(shard_id, fmt)) for shard_id in shard_ids):
+                return fmt
+        raise RuntimeError(f"Cannot tell the format of the shards in {self.directory}: shard files are missing")
+
+    def _migrate_format(self, old_format):
+        """Rewrite every shard from old_format into self.format.
+
+        All new files are written before the map records the new format, and the old
+        files are only removed after that, so an interrupted migration just runs again.
+        """
+        print(f"Migrating {len(self.shards)} shards from {old_format} to {self.format}")
+        for shard in self.shards.values():
+            old_shard = Shard(shard.id, self._shard_path(shard.id, old_format), old_format)
+            if not os.path.exists(old_shard.path):
+                raise RuntimeError(f"Cannot migrate shards: {old_shard.path} is missing")
+            shard.users = old_shard.load()
+            shard.save()
+            shard.users = {}
+        self.save_shard_map()
+        for shard_id in self.shards:
+            os.remove(self._shard_path(shard_id, old_format))
+
+    def save(self, usernames=None):
+        """Save the shards holding usernames, or every shard when usernames is None."""
+        if usernames is None:
+            shards = list(self.shards.values())
+        else:
+            shards = {self.shard_for(username) for username in usernames}
+        for shard in shards:
+            shard.save()
+
+    # Online rebalancing
+
+    def add_shard(self):
+        """Add a shard and move the records it now owns. Returns the number of records moved."""
+        with self.rebalance_lock:
+            new_id = max(self.shards) + 1 if self.shards else 0
+            new_shard = Shard(new_id, self._shard_path(new_id), self.format)
+            old_shards = list(self.shards.values())
+            self.shards[new_id] = new_shard
+            self.previous_ring = self.ring
+            self.ring = build_ring(sorted(self.shards))
+
+            moved = 0
+            sources = set()
+            for shard in old_shards:
+                with shard.lock:
+                    usernames = list(shard.users)
+                for username in usernames:
+                    owner = self.shard_for(username)
+                    if owner is shard:
+                        continue
+                    with self._locked(shard, owner):
+                        if username in shard.users:
+                            owner.users.setdefault(username, shard.users.pop(username))
+                            moved += 1
+                            sources.add(shard)
+
+            # Write the new shard and publish the map before dropping the old copies, so a
+            # crash in between leaves duplicates that load() resolves instead of lost users
+            new_shard.save()
+            self.save_shard_map()
+            for shard in sources:
+                shard.save()
+            self.previous_ring = None
+            print(f"Added shard {new_id}, moved {moved} users")
+            return moved
+
+    # dict interface
+
+    @contextlib.contextmanager
+    def _holding(self, username):
+        """Lock every shard that may hold username and yield (owner, shard holding it or None)."""
+        while True:
+            ring, previous = self.ring, self.previous_ring
+            owner = self._owner(username, ring)
+            # During a rebalance check the old owner first, then the new one
+            shards = [owner]
+            if previous is not None:
+                shards.insert(0, self._owner(username, previous))
+            with self._locked(*shards):
+                if self.ring is not ring or self.previous_ring is not previous:
+                    # A rebalance started or finished while we were locking; look again
+                    continue
+                yield owner, next((shard for shard in shards if username in shard.users), None)
+                return
+
+    @contextlib.contextmanager
+    def locked(self, username):
+        """Hold the lock of the shard holding username for a read-modify-write of its record.
+
+        Call save() after leaving the block, not inside it.
+        """
+        with self._holding(username):
+            yield
+
+    def __getitem__(self, username):
+        with self._holding(username) as (owner, found):
+            if found is None:
+                raise KeyError(username)
+            return found.users[username]
+
+    def __setitem__(self, username, record):
+        with self._holding(username) as (owner, found):
+            if found is not None and found is not owner:
+                del found.users[username]
+            owner.users[username] = record
+
+    def __delitem__(self, username):
+        with self._holding(username) as (owner, found):
+            if found is None:
+                raise KeyError(username)
+            del found.users[username]
+
+    def __contains__(self, username):
+        with self._holding(username) as (owner, found):
+            return found is not None
+
+    def __iter__(self):
+        seen = set()
+        for shard in list(self.shards.values()):
+            with shard.lock:
+                usernames = list(shard.users)
+            for username in usernames:
+                if username not in seen:
+                    seen.add(username)
+                    yield username
+
+    def __len__(self):
+        return sum(len(shard.users) for shard in list(self.shards.values()))
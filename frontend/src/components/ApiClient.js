@@ -103,6 +103,55 @@ class ApiClient {
     }
   }
 
+  /**
+   * Make a conditional POST request using an ETag from a previous response
+   * @param {string} endpoint - The API endpoint
+   * @param {Object} body - The request body data (optional)
+   * @param {string} etag - ETag of the cached response, sent as If-None-Match (optional)
+   * @param {number} timeout - Timeout in milliseconds (default: 120000)
+   * @returns {Promise<Object>} - { notModified, data, etag }; data is null when notModified
+   */
+  async postConditional(endpoint, body = null, etag = null, timeout = 120000) {
+    const url = `${this.baseURL}${endpoint}`
+    const controller = new AbortController()
+    const timeoutId = setTimeout(() => controller.abort(), timeout)
+
+    try {
+      const headers = { 'Content-Type': 'application/json' }
+      if (etag) {
+        headers['If-None-Match'] = etag
+      }
+
+      const response = await fetch(url, {
+        method: 'POST',
+        headers,
+        body: body !== null ? JSON.stringify(body) : undefined,
+        signal: controller.signal
+      })
+
+      if (response.status === 304) {
+        return { notModified: true, data: null, etag }
+      }
+
+      if (!response.ok) {
+        const errorText = await response.text()
+        throw new Error(`HTTP ${response.status}: ${errorText}`)
+      }
+
+      return { notModified: false, data: await response.json(), etag: response.headers.get('ETag') }
+    } catch (error) {
+      console.error('API Client Error:', error)
+
+      if (error.name === 'AbortError') {
+        throw new Error(`Request timed out after ${timeout}ms`)
+      }
+
+      throw error
+    } finally {
+      clearTimeout(timeoutId)
+    }
+  }
+
   /**
    * Update the base URL for the API client
    * @param {string} newBaseURL - The new base URL
@@ -4,6 +4,9 @@ import Tile from './Tile'
 import ApiClient from './ApiClient'
 import './Dashboard.css'
 
+// Last dashboard response per user, reused when the backend answers 304 Not Modified
+const dashboardResponseCache = new Map()
+
 const Dashboard = ({ user, onLogout }) => {
   const [dashboardConfig, setDashboardConfig] = useState(null)
   const [loading, setLoading] = useState(true)
@@ -44,7 +47,14 @@ const Dashboard = ({ user, onLogout }) => {
       await pingLogin()
 
       // Load dashboard configuration from backend API
-      const response = await apiClient.post('/get_dashboard', { username: user.email })
+      const cached = dashboardResponseCache.get(user.email)
+      const result = await apiClient.postConditional('/get_dashboard', { username: user.email }, cached ? cached.etag : null)
+      let response = result.data
+      if (result.notModified) {
+        response = cached.response
+      } else if (result.etag) {
+        dashboardResponseCache.set(user.email, { etag: result.etag, response })
+      }
       
       if (response && response.dashboard) {
         const dashboardData = response.dashboard
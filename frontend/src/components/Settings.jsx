@@ -78,11 +78,15 @@ const Settings = ({ user, onLogout }) => {
     setIsLoading(true)
     try {
       // Use the existing API endpoint for force refresh
-      await apiClient.post('/force_refresh_dashboard', { 
+      const response = await apiClient.post('/force_refresh_dashboard', { 
         username: user.email 
       })
       
-      setSaveStatus('Dashboard refreshed successfully!')
+      if (response && response.stale) {
+        setSaveStatus('AI service is busy, showing your last dashboard. Please try again later.')
+      } else {
+        setSaveStatus('Dashboard refreshed successfully!')
+      }
       
       // Also trigger the global refresh function if available
       if (window.refreshDashboard) {
@@ -92,6 +96,8 @@ const Settings = ({ user, onLogout }) => {
       console.error('Error refreshing dashboard:', error)
       if (error.message.includes('timed out')) {
         setSaveStatus('Request timed out after 2 minutes.')
+      } else if (error.message.includes('HTTP 429')) {
+        setSaveStatus('Too many refreshes. Please wait a few minutes and try again.')
       } else {
         setSaveStatus('Error refreshing dashboard. Please try again.')
       }